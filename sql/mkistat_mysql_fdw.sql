@@ -0,0 +1,94 @@
+-- Server-side alternative to imds-etl.py: let PostgreSQL read MKISTAT from
+-- MySQL directly through mysql_fdw and load it with a single INSERT ... SELECT,
+-- removing the Python process from the data plane entirely.
+--
+-- One-time setup (superuser; mysql_fdw must be installed on the PG host).
+-- Replace the placeholders with the values from the ETL environment
+-- (MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE).
+
+CREATE EXTENSION IF NOT EXISTS mysql_fdw;
+
+CREATE SERVER IF NOT EXISTS mysql_src
+    FOREIGN DATA WRAPPER mysql_fdw
+    OPTIONS (host :'mysql_host', port :'mysql_port');
+
+CREATE USER MAPPING IF NOT EXISTS FOR CURRENT_USER
+    SERVER mysql_src
+    OPTIONS (username :'mysql_user', password :'mysql_password');
+
+-- Column types must match the MySQL MKISTAT schema; adjust if it differs.
+CREATE FOREIGN TABLE IF NOT EXISTS mkistat_src (
+    MKISTAT_INSTRUMENT_CODE      varchar(50),
+    MKISTAT_INSTRUMENT_NUMBER    numeric,
+    MKISTAT_QUOTE_BASES          varchar(50),
+    MKISTAT_OPEN_PRICE           numeric,
+    MKISTAT_PUB_LAST_TRADED_PRICE  numeric,
+    MKISTAT_SPOT_LAST_TRADED_PRICE numeric,
+    MKISTAT_HIGH_PRICE           numeric,
+    MKISTAT_LOW_PRICE            numeric,
+    MKISTAT_CLOSE_PRICE          numeric,
+    MKISTAT_YDAY_CLOSE_PRICE     numeric,
+    MKISTAT_TOTAL_TRADES         numeric,
+    MKISTAT_TOTAL_VOLUME         numeric,
+    MKISTAT_TOTAL_VALUE          numeric,
+    MKISTAT_PUBLIC_TOTAL_TRADES  numeric,
+    MKISTAT_PUBLIC_TOTAL_VOLUME  numeric,
+    MKISTAT_PUBLIC_TOTAL_VALUE   numeric,
+    MKISTAT_SPOT_TOTAL_TRADES    numeric,
+    MKISTAT_SPOT_TOTAL_VOLUME    numeric,
+    MKISTAT_SPOT_TOTAL_VALUE     numeric,
+    MKISTAT_LM_DATE_TIME         timestamp
+)
+SERVER mysql_src
+OPTIONS (dbname :'mysql_database', table_name 'MKISTAT');
+
+-- Same unique index imds-etl.py ensures; dedupe happens in the INSERT below.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mkstat_code_time
+    ON imds_mk_istats (mkstat_instrument_code, mkstat_lm_date_time);
+
+-- The whole ETL as one statement: run on the same schedule as the script.
+INSERT INTO imds_mk_istats (
+    mkstat_instrument_code,
+    mkstat_instrument_number,
+    mkstat_quote_bases,
+    mkstat_open_price,
+    mkstat_pub_last_trade_price,
+    mkstat_spot_last_trade_price,
+    mkstat_high_price,
+    mkstat_low_price,
+    mkstat_close_price,
+    mkstat_yday_close_price,
+    mkstat_total_trades,
+    mkstat_total_volume,
+    mkstat_total_value,
+    mkstat_public_total_trades,
+    mkstat_public_total_volume,
+    mkstat_public_total_value,
+    mkstat_spot_total_trades,
+    mkstat_spot_total_volume,
+    mkstat_spot_total_value,
+    mkstat_lm_date_time
+)
+SELECT
+    MKISTAT_INSTRUMENT_CODE,
+    MKISTAT_INSTRUMENT_NUMBER,
+    MKISTAT_QUOTE_BASES,
+    MKISTAT_OPEN_PRICE,
+    MKISTAT_PUB_LAST_TRADED_PRICE,
+    MKISTAT_SPOT_LAST_TRADED_PRICE,
+    MKISTAT_HIGH_PRICE,
+    MKISTAT_LOW_PRICE,
+    MKISTAT_CLOSE_PRICE,
+    MKISTAT_YDAY_CLOSE_PRICE,
+    MKISTAT_TOTAL_TRADES,
+    MKISTAT_TOTAL_VOLUME,
+    MKISTAT_TOTAL_VALUE,
+    MKISTAT_PUBLIC_TOTAL_TRADES,
+    MKISTAT_PUBLIC_TOTAL_VOLUME,
+    MKISTAT_PUBLIC_TOTAL_VALUE,
+    MKISTAT_SPOT_TOTAL_TRADES,
+    MKISTAT_SPOT_TOTAL_VOLUME,
+    MKISTAT_SPOT_TOTAL_VALUE,
+    MKISTAT_LM_DATE_TIME
+FROM mkistat_src
+ON CONFLICT (mkstat_instrument_code, mkstat_lm_date_time) DO NOTHING;
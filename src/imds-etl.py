@@ -1,106 +1,158 @@
+import io
+import logging
+
 import pandas as pd
-from sqlalchemy import create_engine, MetaData, Table
-from sqlalchemy.orm import sessionmaker
+import pymysql.cursors
+from sqlalchemy import create_engine
 from dotenv import load_dotenv
 from urllib.parse import quote  # Importing quote
 import os
 from datetime import datetime  # Import datetime module
 
-# Log the start time
-start_time = datetime.now()
-print(f"Script started at: {start_time}")
-
-# Load environment variables from .env file
-load_dotenv('../.env')
-
-# Get connection details from environment variables
-mysql_user = os.getenv('MYSQL_USER')
-mysql_password = os.getenv('MYSQL_PASSWORD')
-mysql_encoded_password = quote(mysql_password)  # Encode the password
-
-mysql_host = os.getenv('MYSQL_HOST')
-mysql_port = os.getenv('MYSQL_PORT')
-mysql_database = os.getenv('MYSQL_DATABASE')
-
-postgres_user = os.getenv('POSTGRES_USER')
-postgres_password = os.getenv('POSTGRES_PASSWORD')
-postgres_encoded_password = quote(postgres_password)
-postgres_host = os.getenv('POSTGRES_HOST')
-postgres_port = os.getenv('POSTGRES_PORT')
-postgres_database = os.getenv('POSTGRES_DATABASE')
-
-# Print out the connection parameters for debugging
-print(f"Connecting to MySQL at {mysql_host}:{mysql_port} as {mysql_user}")
-
-# Define MySQL and PostgreSQL connection URLs
-mysql_engine = create_engine(f'mysql+pymysql://{mysql_user}:{mysql_encoded_password}@{mysql_host}:{mysql_port}/{mysql_database}')
-postgresql_engine = create_engine(f'postgresql://{postgres_user}:{postgres_encoded_password}@{postgres_host}:{postgres_port}/{postgres_database}')
-
-# Create a session for PostgreSQL
-Session = sessionmaker(bind=postgresql_engine)
-
-# Fetch data from MySQL
-mysql_query = "SELECT * FROM MKISTAT"
-imds_data = pd.read_sql(mysql_query, mysql_engine)
-
-# Initialize MetaData without the bind argument
-metadata = MetaData()
-
-# Reflect the target table (imds_mk_istats) from the PostgreSQL database
-imds_mk_istat_table = Table('imds_mk_istats', metadata, autoload_with=postgresql_engine)
-
-# Prepare data for bulk insert
-insert_records = []
-
-# Construct records for insertion
-for _, data in imds_data.iterrows():
-    record = {
-        'mkstat_instrument_code': data['MKISTAT_INSTRUMENT_CODE'],
-        'mkstat_instrument_number': data['MKISTAT_INSTRUMENT_NUMBER'],
-        'mkstat_quote_bases': data['MKISTAT_QUOTE_BASES'],
-        'mkstat_open_price': data['MKISTAT_OPEN_PRICE'],
-        'mkstat_pub_last_trade_price': data['MKISTAT_PUB_LAST_TRADED_PRICE'],
-        'mkstat_spot_last_trade_price': data['MKISTAT_SPOT_LAST_TRADED_PRICE'],
-        'mkstat_high_price': data['MKISTAT_HIGH_PRICE'],
-        'mkstat_low_price': data['MKISTAT_LOW_PRICE'],
-        'mkstat_close_price': data['MKISTAT_CLOSE_PRICE'],
-        'mkstat_yday_close_price': data['MKISTAT_YDAY_CLOSE_PRICE'],
-        'mkstat_total_trades': data['MKISTAT_TOTAL_TRADES'],
-        'mkstat_total_volume': data['MKISTAT_TOTAL_VOLUME'],
-        'mkstat_total_value': data['MKISTAT_TOTAL_VALUE'],
-        'mkstat_public_total_trades': data['MKISTAT_PUBLIC_TOTAL_TRADES'],
-        'mkstat_public_total_volume': data['MKISTAT_PUBLIC_TOTAL_VOLUME'],
-        'mkstat_public_total_value': data['MKISTAT_PUBLIC_TOTAL_VALUE'],
-        'mkstat_spot_total_trades': data['MKISTAT_SPOT_TOTAL_TRADES'],
-        'mkstat_spot_total_volume': data['MKISTAT_SPOT_TOTAL_VOLUME'],
-        'mkstat_spot_total_value': data['MKISTAT_SPOT_TOTAL_VALUE'],
-        'mkstat_lm_date_time': data['MKISTAT_LM_DATE_TIME']
+logger = logging.getLogger(__name__)
+
+
+def run():
+    """Run the MKISTAT MySQL-to-PostgreSQL load once.
+
+    Kept as a callable so a driver can schedule this pipeline alongside
+    others (e.g. in a ProcessPoolExecutor) once sibling ETLs exist; each
+    process must create its own engines, which happens inside here.
+    """
+    # Log the start time
+    start_time = datetime.now()
+    logger.info("Script started at: %s", start_time)
+
+    # Load environment variables from .env file
+    load_dotenv('../.env')
+
+    # Get connection details from environment variables
+    mysql_user = os.getenv('MYSQL_USER')
+    mysql_password = os.getenv('MYSQL_PASSWORD')
+    mysql_encoded_password = quote(mysql_password)  # Encode the password
+
+    mysql_host = os.getenv('MYSQL_HOST')
+    mysql_port = os.getenv('MYSQL_PORT')
+    mysql_database = os.getenv('MYSQL_DATABASE')
+
+    postgres_user = os.getenv('POSTGRES_USER')
+    postgres_password = os.getenv('POSTGRES_PASSWORD')
+    postgres_encoded_password = quote(postgres_password)
+    postgres_host = os.getenv('POSTGRES_HOST')
+    postgres_port = os.getenv('POSTGRES_PORT')
+    postgres_database = os.getenv('POSTGRES_DATABASE')
+
+    # Connection parameters are only worth formatting when debugging
+    logger.debug("Connecting to MySQL at %s:%s as %s", mysql_host, mysql_port, mysql_user)
+
+    # Define MySQL and PostgreSQL connection URLs
+    # SSCursor makes MySQL stream rows instead of buffering the whole result set client-side
+    mysql_engine = create_engine(
+        f'mysql+pymysql://{mysql_user}:{mysql_encoded_password}@{mysql_host}:{mysql_port}/{mysql_database}',
+        connect_args={'cursorclass': pymysql.cursors.SSCursor},
+        pool_pre_ping=True
+    )
+    postgresql_engine = create_engine(
+        f'postgresql://{postgres_user}:{postgres_encoded_password}@{postgres_host}:{postgres_port}/{postgres_database}',
+        pool_pre_ping=True,
+        pool_size=5
+    )
+
+    # Map MySQL column names onto the PostgreSQL schema in one vectorized rename
+    col_map = {
+        'MKISTAT_INSTRUMENT_CODE': 'mkstat_instrument_code',
+        'MKISTAT_INSTRUMENT_NUMBER': 'mkstat_instrument_number',
+        'MKISTAT_QUOTE_BASES': 'mkstat_quote_bases',
+        'MKISTAT_OPEN_PRICE': 'mkstat_open_price',
+        'MKISTAT_PUB_LAST_TRADED_PRICE': 'mkstat_pub_last_trade_price',
+        'MKISTAT_SPOT_LAST_TRADED_PRICE': 'mkstat_spot_last_trade_price',
+        'MKISTAT_HIGH_PRICE': 'mkstat_high_price',
+        'MKISTAT_LOW_PRICE': 'mkstat_low_price',
+        'MKISTAT_CLOSE_PRICE': 'mkstat_close_price',
+        'MKISTAT_YDAY_CLOSE_PRICE': 'mkstat_yday_close_price',
+        'MKISTAT_TOTAL_TRADES': 'mkstat_total_trades',
+        'MKISTAT_TOTAL_VOLUME': 'mkstat_total_volume',
+        'MKISTAT_TOTAL_VALUE': 'mkstat_total_value',
+        'MKISTAT_PUBLIC_TOTAL_TRADES': 'mkstat_public_total_trades',
+        'MKISTAT_PUBLIC_TOTAL_VOLUME': 'mkstat_public_total_volume',
+        'MKISTAT_PUBLIC_TOTAL_VALUE': 'mkstat_public_total_value',
+        'MKISTAT_SPOT_TOTAL_TRADES': 'mkstat_spot_total_trades',
+        'MKISTAT_SPOT_TOTAL_VOLUME': 'mkstat_spot_total_volume',
+        'MKISTAT_SPOT_TOTAL_VALUE': 'mkstat_spot_total_value',
+        'MKISTAT_LM_DATE_TIME': 'mkstat_lm_date_time'
     }
-    
-    # Append to insert list
-    insert_records.append(record)
-
-# Using a session context manager for PostgreSQL
-with Session() as session:
-    for record in insert_records:
-        # Check if the row already exists in PostgreSQL
-        existing_record = session.query(imds_mk_istat_table).filter_by(
-            mkstat_instrument_code=record['mkstat_instrument_code'],
-            mkstat_lm_date_time=record['mkstat_lm_date_time']
-        ).first()
-
-        # Insert new record if it doesn't exist
-        if not existing_record:
-            insert_stmt = imds_mk_istat_table.insert().values(record)
-            session.execute(insert_stmt)
-
-    # Commit the changes
-    session.commit()
+
+    # Raw psycopg2 connection for COPY — the fastest bulk-load path PostgreSQL offers
+    pg_raw = postgresql_engine.raw_connection()
+    pg_cursor = pg_raw.cursor()
+
+    # Skip the synchronous WAL flush for this load transaction only (SET LOCAL);
+    # a crash at the wrong moment loses the last run, which the next scheduled
+    # run simply reloads
+    pg_cursor.execute("SET LOCAL synchronous_commit = off")
+
+    # Dedupe is enforced server-side: the unique index lets ON CONFLICT DO NOTHING
+    # discard duplicates with one index probe per row, replacing all client-side
+    # key tracking
+    target_columns = ', '.join(col_map.values())
+    pg_cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_mkstat_code_time "
+        "ON imds_mk_istats (mkstat_instrument_code, mkstat_lm_date_time)"
+    )
+    pg_cursor.execute(
+        f"CREATE TEMP TABLE tmp_imds_mk_istats AS "
+        f"SELECT {target_columns} FROM imds_mk_istats WITH NO DATA"
+    )
+    copy_sql = f"COPY tmp_imds_mk_istats ({target_columns}) FROM STDIN WITH CSV"
+    insert_sql = (
+        f"INSERT INTO imds_mk_istats ({target_columns}) "
+        f"SELECT {target_columns} FROM tmp_imds_mk_istats "
+        f"ON CONFLICT (mkstat_instrument_code, mkstat_lm_date_time) DO NOTHING"
+    )
+
+    # Stream data from MySQL in chunks so peak memory stays at one chunk's worth
+    mysql_query = "SELECT * FROM MKISTAT"
+    inserted_rows = 0
+
+    for imds_data in pd.read_sql(mysql_query, mysql_engine, chunksize=10000):
+        imds_data = imds_data.rename(columns=col_map)[list(col_map.values())]
+
+        # Downcast integer columns (exact) and categorize the low-cardinality string
+        # columns to shrink the in-memory chunk. Floats stay float64: pandas'
+        # downcast='float' rounds within an absolute tolerance rather than requiring
+        # an exact float32 round-trip, which would corrupt price columns
+        for column in imds_data.select_dtypes('integer').columns:
+            imds_data[column] = pd.to_numeric(imds_data[column], downcast='integer')
+        imds_data['mkstat_instrument_code'] = imds_data['mkstat_instrument_code'].astype('category')
+        imds_data['mkstat_quote_bases'] = imds_data['mkstat_quote_bases'].astype('category')
+
+        # COPY the chunk into the staging table, then fold it into the target;
+        # ON CONFLICT drops rows already present (and duplicates within the chunk)
+        csv_buffer = io.StringIO()
+        imds_data.to_csv(csv_buffer, index=False, header=False)
+        csv_buffer.seek(0)
+        pg_cursor.copy_expert(copy_sql, csv_buffer)
+        pg_cursor.execute(insert_sql)
+        inserted_rows += pg_cursor.rowcount
+        pg_cursor.execute("TRUNCATE tmp_imds_mk_istats")
+
+    # Commit once for the whole run — one flush/fsync instead of one per chunk,
+    # and the load becomes all-or-nothing
+    pg_raw.commit()
+    pg_cursor.close()
+    pg_raw.close()
 
     # Log the update completion time
     update_time = datetime.now()
-    print(f"Data inserted successfully! Process completed at: {update_time}")
+    logger.info("Data inserted successfully! %d new rows. Process completed at: %s",
+                inserted_rows, update_time)
+
+    # Calculate the total execution time
+    total_duration = update_time - start_time
+    logger.info("Total execution time: %s", total_duration)
+
 
-# Calculate the total execution time
-total_duration = update_time - start_time
-print(f"Total execution time: {total_duration}")
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+    run()